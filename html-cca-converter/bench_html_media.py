@@ -0,0 +1,183 @@
+#!/usr/bin/env python2.7
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description: Microbenchmark for html_media.extract_media over a corpus of
+# real crawled pages: either a directory of HTML files, e.g. the input of
+# html_cca_converter, or the HTML documents of a CCA dump, which carry their
+# own urls. With -t the Tika parse of the same pages is timed too, so the
+# per document cost of the link/media pass can be compared with the
+# extraction it runs next to.
+#
+#  ./bench_html_media.py -d crawled_pages/ -u http://www.example.com/ -n 5 -t
+#  ./bench_html_media.py -c crawl_20150410_cca/ -m 2000
+
+import os
+import sys
+import getopt
+import json
+import time
+
+from cca_io import disk_order, read_file
+from html_media import extract_media
+
+_helpMessage = '''
+
+Usage: bench_html_media [-d <html dir> [-u <url>] | -c <cca dir>] [-m <max pages>] [-n <rounds>] [-t]
+
+Operation:
+-d --dataDir
+    The directory with the HTML pages to benchmark on.
+-u --url
+    The URL the file names are appended to, used to resolve relative links.
+-c --ccaDir
+    A CCA dump to take the HTML documents and their urls from instead, requires cbor.
+-m --max
+    The maximum number of pages to load.
+-n --rounds
+    The number of timed rounds over all pages (default 3), the best round is reported.
+-t --tika
+    Also time the Tika parse of every page, requires a running Tika server.
+'''
+
+
+class _Usage(Exception):
+    '''An error for problems with arguments on the command line.'''
+
+    def __init__(self, msg):
+        self.msg = msg
+
+
+def list_files(dir):
+    r = []
+    subdirs = [x[0] for x in os.walk(dir)]
+    for subdir in subdirs:
+        files = os.walk(subdir).next()[2]
+        if (len(files) > 0):
+            for file in files:
+                r.append(subdir + "/" + file)
+    return r
+
+
+def timeRounds(func, pages, rounds):
+    best = None
+    for i in range(rounds):
+        start = time.time()
+        for url, content in pages:
+            func(content, url)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def report(name, elapsed, pages, totalBytes):
+    print("%-14s %8.3f s  %8.3f ms/doc  %8.1f MB/s" % (name, elapsed, 1000.0 * elapsed / len(pages),
+                                                     totalBytes / elapsed / (1024 * 1024)))
+
+
+def loadHtmlDir(dataDir, urlDomain, maxPages):
+    pages = []
+    for f in disk_order(list_files(dataDir))[:maxPages]:
+        pages.append((urlDomain + os.path.basename(f), read_file(f).decode("utf-8", "replace")))
+    return pages
+
+
+def loadCCADir(ccaDir, maxPages):
+    import cbor
+    pages = []
+    for f in disk_order(list_files(ccaDir)):
+        if len(pages) >= maxPages:
+            break
+        try:
+            ccaDoc = json.loads(cbor.loads(read_file(f)), encoding='utf8')
+            contentType = ccaDoc["response"]["headers"].get("Content-Type", "")
+            body = ccaDoc["response"].get("body")
+        except Exception as err:
+            print >> sys.stderr, "Skipping " + f + ": " + str(err)
+            continue
+        if body and 'html' in contentType:
+            pages.append((ccaDoc["url"], body))
+    return pages
+
+
+def bench(pages, rounds, tika=False):
+    if not pages:
+        raise _Usage("No pages found")
+    totalBytes = sum(len(content) for url, content in pages)
+    found = [extract_media(content, url) for url, content in pages]
+    print("Pages: %d, %.1f MB, images: %d, videos: %d, outlinks: %d" % (
+        len(pages), totalBytes / (1024.0 * 1024), sum(len(m["images"]) for m in found),
+        sum(len(m["videos"]) for m in found), sum(len(m["outlinks"]) for m in found)))
+
+    report("extract_media", timeRounds(extract_media, pages, rounds), pages, totalBytes)
+    if tika:
+        from tika import parser
+        report("tika", timeRounds(lambda content, url: parser.from_buffer(content.encode("utf-8")), pages, 1),
+               pages, totalBytes)
+
+
+def main(argv=None):
+    if argv is None:
+        argv = sys.argv
+    try:
+        try:
+            opts, args = getopt.getopt(argv[1:], 'hd:u:c:m:n:t',
+                                       ['help', 'dataDir=', 'url=', 'ccaDir=', 'max=', 'rounds=', 'tika'])
+        except getopt.error, msg:
+            raise _Usage(msg)
+
+        if len(opts) == 0:
+            raise _Usage(_helpMessage)
+        dataDir = None
+        url = ""
+        ccaDir = None
+        maxPages = sys.maxint
+        rounds = 3
+        tika = False
+
+        for option, value in opts:
+            if option in ('-h', '--help'):
+                raise _Usage(_helpMessage)
+            elif option in ('-d', '--dataDir'):
+                dataDir = value
+            elif option in ('-u', '--url'):
+                url = value
+            elif option in ('-c', '--ccaDir'):
+                ccaDir = value
+            elif option in ('-m', '--max'):
+                maxPages = int(value)
+            elif option in ('-n', '--rounds'):
+                rounds = int(value)
+            elif option in ('-t', '--tika'):
+                tika = True
+
+        if (dataDir == None) == (ccaDir == None):
+            raise _Usage(_helpMessage)
+
+        if ccaDir:
+            pages = loadCCADir(ccaDir, maxPages)
+        else:
+            pages = loadHtmlDir(dataDir, url, maxPages)
+        bench(pages, rounds, tika)
+
+    except _Usage, err:
+        print >> sys.stderr, sys.argv[0].split('/')[-1] + ': ' + str(err.msg)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,261 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description: Read scheduling helpers shared by the CCA scripts.
+# Dumps on spinning disks and NFS mounts are dominated by seeks and
+# per-file latency when workers open files in os.walk order. The helpers
+# here order the work list by on-disk locality and have the workers ask
+# the kernel to read a whole chunk of files ahead before they read the
+# first one, so that per-file latency overlaps. Optionally the files are
+# read by a small pool of reader threads and the workers receive bytes
+# instead of paths.
+
+import os
+import sys
+import threading
+import collections
+import ctypes
+import ctypes.util
+from multiprocessing.pool import ThreadPool
+
+POSIX_FADV_WILLNEED = 3
+READERS = 8
+
+_libc = None
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    _libc.posix_fadvise.argtypes = [ctypes.c_int, ctypes.c_longlong,
+                                    ctypes.c_longlong, ctypes.c_int]
+except (OSError, AttributeError, TypeError):
+    _libc = None
+
+
+def _disk_key(path):
+    try:
+        st = os.stat(path)
+        return (st.st_dev, st.st_ino, path)
+    except OSError:
+        return None
+
+
+def disk_order(paths, threads=READERS):
+    """
+    Orders paths by device and inode number, which on ext4/xfs closely
+    follows the physical placement of the files. Paths that can not be
+    stat'ed are kept at the end in their original order. The stats are
+    issued from a few threads so their latency overlaps on NFS.
+    :param paths: list of file paths
+    :param threads: number of threads issuing stat calls
+    :return: new list of file paths in disk order
+    """
+    pool = ThreadPool(threads)
+    try:
+        keys = pool.map(_disk_key, paths, chunksize=64)
+    finally:
+        pool.close()
+        pool.join()
+    keyed = sorted(k for k in keys if k is not None)
+    missing = [path for path, k in zip(paths, keys) if k is None]
+    return [k[2] for k in keyed] + missing
+
+
+def will_need(fd, size=0):
+    """
+    Asks the kernel to read the whole file behind fd into the page cache
+    in one go (posix_fadvise WILLNEED) instead of growing the readahead
+    window chunk by chunk. Silently does nothing when the call is not
+    available on this platform.
+    :param fd: open file descriptor
+    :param size: number of bytes to advise, 0 for the whole file
+    """
+    if _libc is not None:
+        _libc.posix_fadvise(fd, 0, size, POSIX_FADV_WILLNEED)
+
+
+def read_file(path):
+    with open(path, "rb") as fd:
+        return fd.read()
+
+
+def stat_and_read(path):
+    """
+    Reads a file, taking its stat first. On atime/relatime mounts the read
+    moves st_atime forward, so callers that use st_atime (e.g. as the
+    import time of html_cca_converter) must use this stat, not a later one.
+    :param path: file path
+    :return: (stat result, bytes)
+    """
+    with open(path, "rb") as fd:
+        st = os.fstat(fd.fileno())
+        return st, fd.read()
+
+
+def read_ahead(paths):
+    """
+    Generator that yields (path, bytes, stat) for a chunk of paths, in
+    order. All files are opened, stat'ed and advised, see will_need(),
+    before the first one is read, so the kernel reads the later files
+    while the earlier ones are processed. Each file is opened once and the
+    stat is taken before the read, see stat_and_read(). Files that fail
+    to open or read are yielded with None as bytes and stat.
+    :param paths: list of file paths, ideally in disk order
+    """
+    opened = []
+    try:
+        for path in paths:
+            try:
+                fd = open(path, "rb")
+                st = os.fstat(fd.fileno())
+            except (IOError, OSError):
+                opened.append((path, None, None))
+                continue
+            opened.append((path, fd, st))
+            will_need(fd.fileno())
+        for path, fd, st in opened:
+            data = None
+            if fd is not None:
+                try:
+                    data = fd.read()
+                except (IOError, OSError):
+                    st = None
+                fd.close()
+            yield path, data, st
+    finally:
+        for path, fd, st in opened:
+            if fd is not None:
+                fd.close()
+
+
+def prefetch(paths, depth=64, readers=READERS):
+    """
+    Generator that yields (path, bytes, stat) for each path, in order. A
+    small pool of reader threads picks up the files in the order of paths
+    and opens, stats and reads them in parallel, so that per-file open
+    latency overlaps; each file is opened once. At most depth files are
+    read ahead of the consumer. The stat is taken before the read, see
+    stat_and_read(). Files that fail to read are yielded with None as
+    bytes and stat so the consumer can report them. Any other error in a
+    reader thread is raised again in the consumer, which would otherwise
+    wait forever for the file.
+    :param paths: list of file paths, ideally in disk order
+    :param depth: number of files to read ahead
+    :param readers: number of reader threads
+    """
+    done = {}
+    ready = threading.Condition()
+    slots = threading.Semaphore(depth)
+    position = [0]
+    positionLock = threading.Lock()
+    stopped = [False]
+
+    def reader():
+        while True:
+            slots.acquire()
+            with positionLock:
+                i = position[0]
+                position[0] += 1
+            if stopped[0] or i >= len(paths):
+                slots.release()
+                return
+            error = None
+            try:
+                item = stat_and_read(paths[i])
+            except (IOError, OSError):
+                item = (None, None)
+            except:
+                item = None
+                error = sys.exc_info()
+            with ready:
+                done[i] = (item, error)
+                ready.notify_all()
+
+    threads = [threading.Thread(target=reader) for n in range(min(readers, len(paths)))]
+    for t in threads:
+        t.daemon = True
+        t.start()
+    try:
+        for i, path in enumerate(paths):
+            with ready:
+                while i not in done:
+                    ready.wait()
+                item, error = done.pop(i)
+            if error is not None:
+                raise error[0], error[1], error[2]
+            slots.release()
+            st, data = item
+            yield path, data, st
+    finally:
+        # also reached when the consumer fails or stops early, wake up the readers so they exit
+        stopped[0] = True
+        for t in threads:
+            slots.release()
+        for t in threads:
+            t.join()
+
+
+def _apply_chunk(func, chunk, withStat, passBytes):
+    items = chunk if passBytes else read_ahead(chunk)
+    if withStat:
+        return [func(path, data, st) for path, data, st in items]
+    return [func(path, data) for path, data, st in items]
+
+
+def prefetch_map(pool, func, paths, depth=64, consume=None, withStat=False, readers=READERS, chunksize=8,
+                 passBytes=False):
+    """
+    Like pool.map(func, paths), but func is called as func(path, data), or
+    as func(path, data, stat) if withStat is set. By default the workers
+    are sent paths and read each chunk with read_ahead(). With passBytes
+    the files are read by prefetch() and their bytes are pickled to the
+    workers instead: this can pay off when per-file latency dominates
+    (spinning disks, NFS), but costs more than it saves on local SSDs or a
+    warm page cache, where the calling process becomes the bottleneck.
+    data is None for files that could not be read, func can then try again
+    and report the error. Files are sent to the pool in chunks,
+    as pool.map does, and at most depth files are outstanding at any time
+    so that a large dump is never held in memory at once.
+    :param pool: a multiprocessing Pool
+    :param func: picklable callable taking (path, data)
+    :param paths: list of file paths, ideally in disk order
+    :param depth: number of files to read ahead and to keep in flight
+    :param consume: optional callable that is handed each result, in the
+        order of paths, in the calling process instead of collecting them
+    :param withStat: pass the stat taken before the read on to func
+    :param readers: number of reader threads with passBytes, see prefetch()
+    :param chunksize: number of files sent to a worker per task, and read ahead by it
+    :param passBytes: read the files in the calling process and pass the bytes
+    :return: list of results in the order of paths, empty if consume is given
+    """
+    pending = collections.deque()
+    maxPending = max(1, depth // chunksize)
+    results = []
+    collect = consume if consume else results.append
+    chunk = []
+    for item in (prefetch(paths, depth, readers) if passBytes else paths):
+        chunk.append(item)
+        if len(chunk) < chunksize:
+            continue
+        pending.append(pool.apply_async(_apply_chunk, (func, chunk, withStat, passBytes)))
+        chunk = []
+        if len(pending) > maxPending:
+            for result in pending.popleft().get():
+                collect(result)
+    if chunk:
+        pending.append(pool.apply_async(_apply_chunk, (func, chunk, withStat, passBytes)))
+    while pending:
+        for result in pending.popleft().get():
+            collect(result)
+    return results
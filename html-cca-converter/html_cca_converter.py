@@ -1,7 +1,9 @@
 # This code converts an html file named by its url to CCA format in CBOR
 
 import os
+import re
 import sys
+import codecs
 import cbor
 from tika import parser
 import getopt
@@ -9,10 +11,11 @@ from urlparse import urlparse
 import hashlib
 import json
 from multiprocessing import Pool
+from cca_io import disk_order, prefetch_map
 
 _helpMessage = '''
 
-Usage: html_cca_converter [<cca dir> [<urlDomain>] [outputDir]]
+Usage: html_cca_converter [<cca dir> [<urlDomain>] [outputDir]] [-b]
 
 Operation:
 -d --dataDir
@@ -21,8 +24,13 @@ Operation:
     The URL to be appended to filenames to get exact urls.
 -o --outputDir
 	The path to an outputDir where the CCA documents will be stored 
+-b --passBytes
+    Read the files in the main process and pass their bytes to the workers. Faster on
+    spinning disks and NFS mounts, slower on local SSDs or when the files are cached.
 '''
 
+_charsetPattern = re.compile(r'<meta[^>]+charset\s*=\s*["\']?([A-Za-z0-9_.:-]+)', re.I)
+
 global urlDomain
 global outputDir
 
@@ -58,12 +66,46 @@ def getContentType():
     return contentType
 
 
-def getFileContents(file):
-    f = open(file, "r")
-    content = f.read()
-    content = "<html><head></head><body> " + content + "</body></html>"
-    f.close()
-    return content
+def getCharset(content):
+    """
+    Detects the charset of raw page bytes from a BOM or a <meta> charset
+    declaration in the first 1024 bytes, as browsers do. Only a BOM selects
+    UTF-16: a page whose <meta> could be read is ASCII compatible, so a
+    declared UTF-16 or UTF-32 is taken as UTF-8, as the HTML spec says.
+    :param content: raw page bytes
+    :return: codec name, or None if the page does not declare one
+    """
+    if content.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+    if content.startswith(codecs.BOM_UTF16_LE) or content.startswith(codecs.BOM_UTF16_BE):
+        return "utf-16"
+    match = _charsetPattern.search(content, 0, 1024)
+    if match:
+        try:
+            name = codecs.lookup(match.group(1)).name
+        except LookupError:
+            return None
+        if name.startswith(("utf-16", "utf-32")):
+            return "utf-8"
+        return name
+    return None
+
+
+def getFileContents(file, content=None):
+    if content is None:
+        f = open(file, "rb")
+        content = f.read()
+        f.close()
+    # decode exactly once, json.dumps then escapes the unicode without decoding it again
+    charset = getCharset(content)
+    if charset:
+        body = content.decode(charset, "replace")
+    else:
+        try:
+            body = content.decode("utf-8")
+        except UnicodeDecodeError:
+            body = content.decode("windows-1252", "replace")
+    return u"".join((u"<html><head></head><body> ", body, u"</body></html>"))
 
 
 def writeToOutput(ccaDoc, outputDir):
@@ -76,13 +118,16 @@ def writeToOutput(ccaDoc, outputDir):
     f.close()
 
 
-def getCCA(file, urlDomain):
-    creationTime = int(os.stat(file).st_atime)
+def getCCA(file, urlDomain, content=None, st=None):
+    # st must be taken before content was read, reading moves atime forward
+    if st is None:
+        st = os.stat(file)
+    creationTime = int(st.st_atime)
     url = urlDomain + os.path.basename(file)
     # print("Processing file : " + url)
     imported = creationTime
     response = {}
-    response["body"] = getFileContents(file)
+    response["body"] = getFileContents(file, content)
     response["headers"] = {}
     response["headers"]["Content-Type"] = getContentType()
     key = getKey(url, creationTime)
@@ -94,18 +139,19 @@ def getCCA(file, urlDomain):
     return ccaDoc
 
 
-def convertFileToCCA(file):
+def convertFileToCCA(file, content=None, st=None):
     global urlDomain
     global outputDir
-    ccaDoc = getCCA(file, urlDomain)
+    ccaDoc = getCCA(file, urlDomain, content, st)
     writeToOutput(ccaDoc, outputDir)
     print ("Converted " + str(file) + " to " + ccaDoc["key"])
 
 
-def convertToCCA(dataDir, urlDomain, outputDir):
-    htmlFileList = list_files(dataDir)
+def convertToCCA(dataDir, urlDomain, outputDir, passBytes=False):
+    # schedule reads in disk order, workers read ahead each chunk of files, see cca_io
+    htmlFileList = disk_order(list_files(dataDir))
     pool = Pool(3)
-    results = pool.map(convertFileToCCA, htmlFileList)
+    results = prefetch_map(pool, convertFileToCCA, htmlFileList, withStat=True, passBytes=passBytes)
     pool.close()
     pool.join()
     # for file in htmlFileList:
@@ -137,7 +183,8 @@ def main(argv=None):
     global outputDir
     try:
         try:
-            opts, args = getopt.getopt(argv[1:], 'hv:d:u:o:', ['help', 'verbose', 'dataDir=', 'url=', 'outputDir='])
+            opts, args = getopt.getopt(argv[1:], 'hv:d:u:o:b',
+                                       ['help', 'verbose', 'dataDir=', 'url=', 'outputDir=', 'passBytes'])
         except getopt.error, msg:
             raise _Usage(msg)
 
@@ -148,6 +195,7 @@ def main(argv=None):
         dataDir = None
         url = None
         index = None
+        passBytes = False
 
         for option, value in opts:
             if option in ('-h', '--help'):
@@ -161,12 +209,14 @@ def main(argv=None):
                 url = value
             elif option in ('-o', '--outputDir'):
                 outputDir = value
+            elif option in ('-b', '--passBytes'):
+                passBytes = True
 
         if dataDir == None or url == None or outputDir == None:
             raise _Usage(_helpMessage)
         urlDomain = url
 
-        convertToCCA(dataDir, url, outputDir)
+        convertToCCA(dataDir, url, outputDir, passBytes)
 
     except _Usage, err:
         print >> sys.stderr, sys.argv[0].split('/')[-1] + ': ' + str(err.msg)
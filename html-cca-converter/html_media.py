@@ -0,0 +1,178 @@
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description: Collects image, video and outlink URLs from an HTML page in
+# a single pass of a tokenizer that only looks at the tags carrying those
+# URLs, resolving them against the page url (or its first <base href>).
+# Used by memex_cca_esindex to fill crawl_data.images, crawl_data.videos and
+# crawl_data.outlinks next to the Tika extraction; see bench_html_media.py.
+
+import re
+from HTMLParser import HTMLParser
+from urlparse import urljoin
+
+# attribute text of a tag, a '>' inside a quoted value does not end the tag
+_ATTRS = r"""([^'">]*(?:(?:"[^"]*"|'[^']*')[^'">]*)*)"""
+# comment and script/style openers are matched too, so that tags inside them can be skipped
+# of the closing tags only </video> matters
+_tagPattern = re.compile(r'<(!--)|<(?:(script|style)|(img|a|area|video|/video|source|base))(?=[\s/>])', re.I)
+_attrsPattern = re.compile(_ATTRS + r'>')
+_unquotedPattern = re.compile(r"""[^'">]*""")
+_closePatterns = {"!--": re.compile(r'-->'),
+                  "script": re.compile(r'</script\s*>', re.I),
+                  "style": re.compile(r'</style\s*>', re.I)}
+_attrPattern = re.compile(r'([a-zA-Z_:][-a-zA-Z0-9_:.]*)\s*=\s*(?:"([^"]*)"|\'([^\']*)\'|([^\s"\'=<>`]+))')
+_SKIPPED_SCHEMES = ("javascript:", "mailto:", "data:", "tel:", "#")
+_ABSOLUTE_SCHEMES = ("http://", "https://")
+_entities = HTMLParser()
+
+
+def parse_attrs(text):
+    attrs = {}
+    for match in _attrPattern.finditer(text):
+        name = match.group(1).lower()
+        if name not in attrs:
+            value = match.group(2)
+            if value is None:
+                value = match.group(3) if match.group(3) is not None else match.group(4)
+            attrs[name] = value
+    return attrs
+
+
+def scan_attrs(html, pos, failedQuotes):
+    """
+    Finds the end of the attributes of a tag whose _attrsPattern match
+    failed. A '>' inside a quoted value does not end the tag, so a quote
+    that is never closed makes the match scan to the end of the page, as
+    would every later tag that runs into it. Once a match failed, the tags
+    of a page are scanned quote by quote here instead, keeping the positions
+    of the quotes opened by failed scans: a scan that reaches one of them
+    fails at once.
+    :param html: page content
+    :param pos: position after the tag name
+    :param failedQuotes: set of quote positions of failed scans, updated
+    :return: (attribute text, position after the tag), or (None, position
+        to continue from) if the tag is not closed
+    """
+    start = pos
+    pos = _unquotedPattern.match(html, pos).end()
+    # every tag up to here runs into the same quote, continue from it if this one fails
+    resume = pos
+    opened = []
+    while pos not in failedQuotes:
+        if pos < len(html) and html[pos] == ">":
+            return html[start:pos], pos + 1
+        opened.append(pos)
+        close = html.find(html[pos], pos + 1) if pos < len(html) else -1
+        if close < 0:
+            break
+        pos = _unquotedPattern.match(html, close + 1).end()
+    failedQuotes.update(opened)
+    return None, resume
+
+
+def extract_media(html, url):
+    """
+    Extracts image, video and outlink URLs from a page.
+    :param html: page content, unicode or utf-8 bytes (decoded with replacement)
+    :param url: url of the page, used to resolve relative URLs
+    :return: dict with "images", "videos" and "outlinks" lists of absolute URLs
+    """
+    if isinstance(html, str):
+        html = html.decode("utf-8", "replace")
+    found = []
+    base = None
+    inVideo = 0
+    # openers without a closer, an unclosed comment or script is searched for only once
+    unclosed = set()
+    failedQuotes = set()
+    pos = 0
+    while True:
+        match = _tagPattern.search(html, pos)
+        if match is None:
+            break
+        pos = match.end()
+        opener = match.group(1)
+        if not opener:
+            tag = match.group(3)
+            if tag and tag[0] == "/":
+                if inVideo:
+                    inVideo -= 1
+                continue
+            attrMatch = None if failedQuotes else _attrsPattern.match(html, pos)
+            if attrMatch:
+                attrText, pos = attrMatch.group(1), attrMatch.end()
+            else:
+                attrText, pos = scan_attrs(html, pos, failedQuotes)
+                if attrText is None:
+                    continue
+            opener = match.group(2)
+        if opener:
+            opener = opener.lower()
+            if opener not in unclosed:
+                close = _closePatterns[opener].search(html, pos)
+                if close:
+                    pos = close.end()
+                else:
+                    unclosed.add(opener)
+            continue
+        tag = tag.lower()
+        attrs = parse_attrs(attrText)
+        if tag == "img":
+            found.append(("images", attrs.get("src")))
+            for candidate in (attrs.get("srcset") or "").split(","):
+                candidate = candidate.split()
+                if candidate:
+                    found.append(("images", candidate[0]))
+        elif tag == "a" or tag == "area":
+            found.append(("outlinks", attrs.get("href")))
+        elif tag == "video":
+            found.append(("videos", attrs.get("src")))
+            if not attrText.rstrip().endswith("/"):
+                inVideo += 1
+        elif tag == "source" and inVideo:
+            found.append(("videos", attrs.get("src")))
+        elif tag == "base" and base is None and attrs.get("href"):
+            # only the first <base href> counts, and it applies to the whole document
+            base = attrs["href"].strip()
+    base = urljoin(url, base) if base else url
+
+    urls = {"images": [], "videos": [], "outlinks": []}
+    seen = {"images": set(), "videos": set(), "outlinks": set()}
+    # pages repeat the same src/href a lot, urljoin is the expensive part
+    resolvedCache = {}
+    for kind, value in found:
+        if not value:
+            continue
+        resolved = resolvedCache.get(value)
+        if resolved is None:
+            resolved = resolve(base, value)
+            resolvedCache[value] = resolved
+        if resolved and resolved not in seen[kind]:
+            seen[kind].add(resolved)
+            urls[kind].append(resolved)
+    return urls
+
+
+def resolve(base, value):
+    value = value.strip()
+    if not value or value.lower().startswith(_SKIPPED_SCHEMES):
+        return ""
+    if "&" in value:
+        value = _entities.unescape(value)
+    if value.startswith(_ABSOLUTE_SCHEMES) and "/." not in value:
+        return value.split("#", 1)[0]
+    return urljoin(base, value).split("#", 1)[0]
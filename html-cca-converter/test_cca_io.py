@@ -0,0 +1,107 @@
+#!/usr/bin/env python2.7
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description: Tests for the read scheduling helpers in cca_io.
+# Run with: python2.7 -m unittest test_cca_io
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import cca_io
+
+
+class PrefetchTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.paths = []
+        for n in range(50):
+            path = os.path.join(self.dir, "%02d.html" % n)
+            with open(path, "wb") as f:
+                f.write("page %d" % n)
+            self.paths.append(path)
+        self.stat_and_read = cca_io.stat_and_read
+
+    def tearDown(self):
+        cca_io.stat_and_read = self.stat_and_read
+        shutil.rmtree(self.dir)
+
+    def consume(self, paths):
+        # runs the generator in a thread, so that a hang fails the test instead of blocking it
+        result = {}
+
+        def run():
+            try:
+                result["items"] = list(cca_io.prefetch(paths, depth=8, readers=4))
+            except Exception as err:
+                result["error"] = err
+        t = threading.Thread(target=run)
+        t.daemon = True
+        t.start()
+        t.join(10)
+        self.assertFalse(t.is_alive(), "prefetch did not return")
+        return result
+
+    def testInOrder(self):
+        result = self.consume(self.paths)
+        self.assertEqual([(path, data) for path, data, st in result["items"]],
+                         [(path, "page %d" % n) for n, path in enumerate(self.paths)])
+
+    def testMissingFile(self):
+        paths = self.paths[:3] + [os.path.join(self.dir, "missing.html")]
+        items = self.consume(paths)["items"]
+        self.assertEqual(items[3], (paths[3], None, None))
+        self.assertEqual(items[2][1], "page 2")
+
+    def testReaderErrorIsRaised(self):
+        def failing(path):
+            if path.endswith("20.html"):
+                raise ValueError("bad file")
+            return self.stat_and_read(path)
+        cca_io.stat_and_read = failing
+        result = self.consume(self.paths)
+        self.assertTrue(isinstance(result.get("error"), ValueError))
+
+
+class ReadAheadTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def testChunk(self):
+        paths = []
+        for n in range(3):
+            path = os.path.join(self.dir, "%d.html" % n)
+            with open(path, "wb") as f:
+                f.write("page %d" % n)
+            paths.append(path)
+        paths.insert(1, os.path.join(self.dir, "missing.html"))
+        items = list(cca_io.read_ahead(paths))
+        self.assertEqual([(path, data) for path, data, st in items],
+                         [(paths[0], "page 0"), (paths[1], None), (paths[2], "page 1"), (paths[3], "page 2")])
+        self.assertEqual(items[1][2], None)
+        self.assertEqual(items[2][2].st_size, 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
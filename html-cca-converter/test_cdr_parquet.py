@@ -0,0 +1,106 @@
+#!/usr/bin/env python2.7
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description: Tests for the Parquet sink of memex_cca_esindex, which write
+# CDR documents and read the file back. Skipped without pyarrow.
+# Run with: python2.7 -m unittest test_cdr_parquet
+
+import os
+import time
+import shutil
+import datetime
+import tempfile
+import unittest
+
+from cdr_parquet import CDRParquetWriter, pa, pq, _DICTIONARY_COLUMNS, _LARGE_COLUMNS, _URL_LIST_COLUMNS
+
+_IMPORTED = 1420070400
+
+
+def cdrDoc(n):
+    # as built by esIndexDoc
+    return {
+        "id": "%064X" % n,
+        "url": "http://www.example.com/%d.html" % n,
+        "obj_original_url": "http://www.example.com/%d.html" % n,
+        "timestamp": datetime.datetime.fromtimestamp(_IMPORTED + n),
+        "team": "JPL",
+        "crawler": "Nutch 1.11-SNAPSHOT",
+        "content_type": "text/html",
+        "version": 2.0,
+        "obj_parent": None,
+        "crawl_data": {"images": ["http://www.example.com/%d.png" % n], "videos": [],
+                       "outlinks": ["http://www.example.com/%d.html" % (n + 1)]},
+        "raw_content": u"<html><body><p>page %d</p></body></html>" % n,
+        "extracted_text": u"page %d" % n,
+        "extracted_metadata": {"Content-Type": "text/html"},
+    }
+
+
+@unittest.skipIf(pa is None, "requires pyarrow")
+class CDRParquetWriterTest(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, "cdr.parquet")
+        # a naive local datetime must not be shifted by the UTC offset
+        self.tz = os.environ.get("TZ")
+        os.environ["TZ"] = "America/Los_Angeles"
+        time.tzset()
+
+    def tearDown(self):
+        if self.tz is None:
+            del os.environ["TZ"]
+        else:
+            os.environ["TZ"] = self.tz
+        time.tzset()
+        shutil.rmtree(self.dir)
+
+    def write(self, count, rowGroupSize=2):
+        writer = CDRParquetWriter(self.path, rowGroupSize=rowGroupSize)
+        for n in range(count):
+            writer.write(cdrDoc(n))
+        writer.close()
+        return writer
+
+    def testReadBack(self):
+        self.assertEqual(self.write(5).count, 5)
+        table = pq.read_table(self.path)
+        self.assertEqual(table.num_rows, 5)
+        self.assertEqual(table.column("timestamp").cast(pa.int64()).to_pylist(),
+                         [(_IMPORTED + n) * 1000 for n in range(5)])
+        self.assertEqual(table.column("id").to_pylist(), ["%064X" % n for n in range(5)])
+        self.assertEqual(table.column("outlinks").to_pylist()[4], ["http://www.example.com/5.html"])
+        self.assertEqual(table.column("extracted_metadata").to_pylist()[0], '{"Content-Type": "text/html"}')
+        self.assertEqual(pq.ParquetFile(self.path).metadata.num_row_groups, 3)
+
+    def testColumnEncoding(self):
+        self.write(5)
+        metadata = pq.ParquetFile(self.path).metadata
+        for i in range(metadata.num_row_groups):
+            rowGroup = metadata.row_group(i)
+            for j in range(rowGroup.num_columns):
+                column = rowGroup.column(j)
+                name = column.path_in_schema.split(".")[0]
+                codec = "ZSTD" if name in _LARGE_COLUMNS or name in _URL_LIST_COLUMNS else "SNAPPY"
+                self.assertEqual(column.compression, codec, column.path_in_schema)
+                dictionary = "PLAIN_DICTIONARY" in column.encodings or "RLE_DICTIONARY" in column.encodings
+                self.assertEqual(dictionary, name in _DICTIONARY_COLUMNS, column.path_in_schema)
+
+
+if __name__ == "__main__":
+    unittest.main()
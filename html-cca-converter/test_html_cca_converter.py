@@ -0,0 +1,76 @@
+#!/usr/bin/env python2.7
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description: Tests for the charset detection and decoding of
+# html_cca_converter. Run with: python2.7 -m unittest test_html_cca_converter
+
+import codecs
+import unittest
+
+from html_cca_converter import getCharset, getFileContents
+
+
+def body(content):
+    page = getFileContents(None, content)
+    prefix, suffix = u"<html><head></head><body> ", u"</body></html>"
+    assert page.startswith(prefix) and page.endswith(suffix)
+    return page[len(prefix):-len(suffix)]
+
+
+class CharsetTest(unittest.TestCase):
+
+    def testUtf8Bom(self):
+        content = codecs.BOM_UTF8 + u"caf\xe9".encode("utf-8")
+        self.assertEqual(getCharset(content), "utf-8-sig")
+        self.assertEqual(body(content), u"caf\xe9")
+
+    def testUtf16Bom(self):
+        for encoding in ("utf-16-le", "utf-16-be"):
+            bom = codecs.BOM_UTF16_LE if encoding == "utf-16-le" else codecs.BOM_UTF16_BE
+            content = bom + u"<p>caf\xe9</p>".encode(encoding)
+            self.assertEqual(getCharset(content), "utf-16")
+            self.assertEqual(body(content), u"<p>caf\xe9</p>")
+
+    def testMetaCharset(self):
+        content = u'<meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS"><p>日本'.encode("shift_jis")
+        self.assertEqual(getCharset(content), "shift_jis")
+        self.assertEqual(body(content), u'<meta http-equiv="Content-Type" content="text/html; charset=Shift_JIS">'
+                                        u'<p>日本')
+
+    def testMetaUtf16IsUtf8(self):
+        for declared in ("utf-16", "UTF-16LE", "utf-16be", "utf-32"):
+            content = ('<meta charset="%s"><p>caf\xc3\xa9</p>' % declared)
+            self.assertEqual(getCharset(content), "utf-8")
+            self.assertEqual(body(content), u'<meta charset="%s"><p>caf\xe9</p>' % declared)
+
+    def testUnknownMetaCharset(self):
+        self.assertEqual(getCharset('<meta charset="no-such-charset"><p>x</p>'), None)
+
+    def testUndeclaredUtf8(self):
+        content = u"<p>caf\xe9 €</p>".encode("utf-8")
+        self.assertEqual(getCharset(content), None)
+        self.assertEqual(body(content), u"<p>caf\xe9 €</p>")
+
+    def testCp1252Fallback(self):
+        # not valid utf-8: 0xe9 and the 0x80 euro sign of windows-1252
+        content = "<p>caf\xe9 \x80 \x81</p>"
+        self.assertEqual(getCharset(content), None)
+        self.assertEqual(body(content), u"<p>caf\xe9 € �</p>")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python2.7
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description: Tests for html_media.extract_media. The pages under
+# testdata/html_media follow the layout of real news, video and classified
+# ad pages. Run with: python2.7 -m unittest test_html_media
+
+import os
+import time
+import unittest
+
+from html_media import extract_media
+
+_testData = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testdata", "html_media")
+
+
+def readPage(name):
+    with open(os.path.join(_testData, name), "rb") as f:
+        return f.read()
+
+
+class ExtractMediaPagesTest(unittest.TestCase):
+
+    def testNewsArticle(self):
+        media = extract_media(readPage("news_article.html"), "https://news.example.com/2016/01/storm.html")
+        self.assertEqual(media["images"], [
+            "https://news.example.com/static/logo.svg",
+            "https://news.example.com/world/images/storm-640.jpg",
+            "https://news.example.com/world/images/storm-1280.jpg",
+            "https://cdn.example.com/storm-2560.jpg",
+            "https://news.example.com/world/images/map.png",
+        ])
+        self.assertEqual(media["outlinks"], [
+            "https://news.example.com/",
+            "https://news.example.com/world/",
+            "https://news.example.com/travel/closures?region=north&day=mon",
+            "https://weather.example.org/forecast",
+            "https://news.example.com/about/",
+            "https://news.example.com/privacy",
+        ])
+        self.assertEqual(media["videos"], [])
+
+    def testVideoPage(self):
+        media = extract_media(readPage("video_page.html"), "http://clips.example.com/today/index.html")
+        self.assertEqual(media["videos"], [
+            "http://clips.example.com/media/clip.webm",
+            "http://clips.example.com/media/clip.mp4",
+            "http://clips.example.com/today/teaser.mp4",
+        ])
+        self.assertEqual(media["images"], ["http://clips.example.com/img/thumb.jpg"])
+        self.assertEqual(media["outlinks"], [
+            "http://clips.example.com/media/clip.mp4",
+            "http://clips.example.com/clips/?page=2",
+        ])
+
+    def testClassifieds(self):
+        media = extract_media(readPage("classifieds.html"), "http://ads.example.com/list/page1.html")
+        self.assertEqual(media["images"], [
+            "http://ads.example.com/img/1001-a.jpg",
+            "http://ads.example.com/img/1002.jpg",
+            "http://ads.example.com/img/map.png",
+        ])
+        self.assertEqual(media["outlinks"], [
+            "http://ads.example.com/ads/1001",
+            "http://ads.example.com/ads/1002?ref=list&lang=fr",
+            "http://ads.example.com/region/north",
+            "http://ads.example.com/region/south",
+        ])
+
+
+class ExtractMediaTokenizerTest(unittest.TestCase):
+    url = "http://x.com/dir/page.html"
+
+    def testGreaterThanInQuotedValue(self):
+        media = extract_media(u'<img src="i.png" alt="a > b" srcset="s1.png 1x, s2.png 2x">'
+                              u'<img alt="p > q" src="lost.png">', self.url)
+        self.assertEqual(media["images"], ["http://x.com/dir/i.png", "http://x.com/dir/s1.png",
+                                           "http://x.com/dir/s2.png", "http://x.com/dir/lost.png"])
+
+    def testSrcsetWhitespace(self):
+        media = extract_media(u'<img srcset="t1.png\t1x,\nt2.png  2x">', self.url)
+        self.assertEqual(media["images"], ["http://x.com/dir/t1.png", "http://x.com/dir/t2.png"])
+
+    def testScriptAndStyleSkipped(self):
+        media = extract_media(u'<script>document.write(\'<img src="fromjs.png">\')</script>'
+                              u'<STYLE>a > img { }</STYLE><img src="ok.png">', self.url)
+        self.assertEqual(media["images"], ["http://x.com/dir/ok.png"])
+
+    def testBytesWithEntity(self):
+        media = extract_media('<a href="caf\xc3\xa9?a=1&amp;b=2">\xc3\xa9</a>', self.url)
+        self.assertEqual(media["outlinks"], [u"http://x.com/dir/caf\xe9?a=1&b=2"])
+
+    def testFirstBaseAppliesToWholeDocument(self):
+        media = extract_media(u'<a href="before.html"><base href="/b1/"><base href="/b2/">'
+                              u'<a href="after.html">', self.url)
+        self.assertEqual(media["outlinks"], ["http://x.com/b1/before.html", "http://x.com/b1/after.html"])
+
+    def testUnterminatedTag(self):
+        media = extract_media(u'<img src="x.png" ' + u'a' * 10000, self.url)
+        self.assertEqual(media, {"images": [], "videos": [], "outlinks": []})
+
+    def testUnterminatedScriptCommentAndQuote(self):
+        media = extract_media(u'<!-- <img src="c.png"> --><script><img src="s.png"></script>'
+                              u'<a href="u.html" title="x><!-- <script><img src="i.png">', self.url)
+        self.assertEqual(media["images"], ["http://x.com/dir/i.png"])
+        self.assertEqual(media["outlinks"], [])
+
+    def testUnterminatedTimes(self):
+        # each of these scanned to the end of the page for every opener, taking seconds
+        for page in (u"<p>text</p><script " * 3000 + u"x" * 240000,
+                     u"<!-- <style>" * 3000 + u"x" * 260000,
+                     u'<a href="x \'y ' * 20000,
+                     u'<img src=x ' * 30000):
+            start = time.time()
+            media = extract_media(page, self.url)
+            self.assertEqual(media, {"images": [], "videos": [], "outlinks": []})
+            self.assertTrue(time.time() - start < 1.0, page[:20])
+
+
+if __name__ == "__main__":
+    unittest.main()
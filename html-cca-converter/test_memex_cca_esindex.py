@@ -0,0 +1,103 @@
+#!/usr/bin/env python2.7
+# encoding: utf-8
+# Licensed to the Apache Software Foundation (ASF) under one or more
+# contributor license agreements.  See the NOTICE file distributed with
+# this work for additional information regarding copyright ownership.
+# The ASF licenses this file to You under the Apache License, Version 2.0
+# (the "License"); you may not use this file except in compliance with
+# the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+# Description: Tests for the CCA key lookup and the command line checks of
+# memex_cca_esindex. Run with: python2.7 -m unittest test_memex_cca_esindex
+
+import json
+import unittest
+from StringIO import StringIO
+
+import cbor
+
+import memex_cca_esindex
+from memex_cca_esindex import getCCAKey
+
+_KEY = "C0FFEE" * 10 + "ABCD"
+
+
+def ccaBytes(text):
+    return cbor.dumps(text)
+
+
+class GetCCAKeyTest(unittest.TestCase):
+
+    def testNutchDocument(self):
+        # Nutch writes request and response first, their headers can have a "key" too
+        text = json.dumps({"request": {"headers": {"key": "request-header"}},
+                           "response": {"headers": {"key": "response-header"}, "body": "<p>x</p>"}})
+        text = text[:-1] + ', "key": "%s", "imported": 1420070400}' % _KEY
+        self.assertEqual(getCCAKey("dump/file", ccaBytes(text)), _KEY)
+
+    def testKeyInBody(self):
+        body = '<script>var doc = {"key": "from-body"};</script>'
+        text = '{"key": "%s", "response": {"body": %s}}' % (_KEY, json.dumps(body))
+        self.assertTrue('"key\\": \\"from-body' in text)
+        self.assertEqual(getCCAKey("dump/file", ccaBytes(text)), _KEY)
+
+    def testKeyOnly(self):
+        self.assertEqual(getCCAKey("dump/file", ccaBytes('{"key":"%s"}' % _KEY)), _KEY)
+
+    def testEscapedKeyValue(self):
+        self.assertEqual(getCCAKey("dump/file", ccaBytes('{"key": "a\\"b\\u00e9"}')), u'a"b\xe9')
+
+    def testFullParseFallback(self):
+        # the member name is escaped, only a full parse finds it
+        text = '{"url": "http://www.example.com/", "\\u006bey": "%s"}' % _KEY
+        self.assertEqual(getCCAKey("dump/file", ccaBytes(text)), _KEY)
+
+    def testKeyFromName(self):
+        data = ccaBytes('{"key": "from-content"}')
+        self.assertEqual(getCCAKey("dump/" + _KEY, data, keyFromName=True), _KEY)
+        self.assertEqual(getCCAKey("dump/" + _KEY, data), "from-content")
+        self.assertEqual(getCCAKey("dump/" + _KEY.lower(), data, keyFromName=True), "from-content")
+
+
+class MainTest(unittest.TestCase):
+
+    def setUp(self):
+        self.stdout, self.stderr = memex_cca_esindex.sys.stdout, memex_cca_esindex.sys.stderr
+        memex_cca_esindex.sys.stdout, memex_cca_esindex.sys.stderr = StringIO(), StringIO()
+        self.esIndex = memex_cca_esindex.esIndex
+        self.calls = []
+        memex_cca_esindex.esIndex = lambda *args: self.calls.append(args)
+
+    def tearDown(self):
+        memex_cca_esindex.sys.stdout, memex_cca_esindex.sys.stderr = self.stdout, self.stderr
+        memex_cca_esindex.esIndex = self.esIndex
+
+    def main(self, *args):
+        return memex_cca_esindex.main(["memex_cca_esindex"] + list(args))
+
+    def testReconcile(self):
+        self.assertEqual(self.main("-r", "-d", "dump", "-u", "http://localhost:9200", "-i", "memex", "-o", "page"),
+                         None)
+        self.assertEqual(len(self.calls), 1)
+
+    def testReconcileUnknownFormat(self):
+        self.assertEqual(self.main("-r", "-d", "dump", "-u", "http://localhost:9200", "-i", "memex", "-o", "page",
+                                   "-f", "bogus"), 2)
+        self.assertEqual(self.calls, [])
+
+    def testUnknownFormat(self):
+        self.assertEqual(self.main("-t", "JPL", "-c", "Nutch", "-d", "dump", "-i", "memex", "-o", "page",
+                                   "-p", "out", "-s", "store", "-f", "bogus"), 2)
+        self.assertEqual(self.calls, [])
+
+
+if __name__ == "__main__":
+    unittest.main()